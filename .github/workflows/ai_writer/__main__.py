@@ -0,0 +1,3 @@
+from ai_writer.core import main
+
+main()
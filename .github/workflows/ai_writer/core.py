@@ -0,0 +1,703 @@
+import os, io, re, stat, mmap, fnmatch, functools, json, sys, subprocess, pathlib, time, hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import ijson  # incremental JSON parsing of the streamed response
+except ImportError:
+    ijson = None
+
+try:
+    import orjson  # C JSON parser/serializer for model output and caches
+except ImportError:
+    orjson = None
+
+try:
+    import fastjsonschema  # compiled validator for the model's results
+except ImportError:
+    fastjsonschema = None
+
+# openai, yaml and pygit2 are imported lazily: most runs exit before needing them
+
+ROOT = pathlib.Path(".")
+ALLOW_MAX_BYTES = 400_000  # guardrail: total file bytes
+MODEL = os.getenv("OPENAI_MODEL", "gpt-5")  # override via repo secret/var if desired
+BATCH_POLL_SECONDS = 30
+BATCH_MAX_POLLS = 20  # per collecting run; a batch still pending after that is left for a later run
+
+# orjson rejects lone surrogates, which os.scandir uses for non-UTF-8 file names;
+# json round-trips them as \udcXX escapes, so both helpers fall back to it
+def loads(data):
+    # str or bytes in; orjson.JSONDecodeError subclasses ValueError like json's
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            pass
+    return json.loads(data)
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(obj).encode("utf-8")
+
+# INPUT_PROMPT is either a plain request or a JSON list of tasks, each a {id, prompt}
+# object or a bare prompt string (ids are then generated from the position)
+def parse_tasks(raw):
+    try:
+        tasks = json.loads(raw)
+    except ValueError:
+        tasks = None
+    if not isinstance(tasks, list):
+        return [{"id": "1", "prompt": raw}]
+    out = []
+    for i, t in enumerate(tasks, 1):
+        if isinstance(t, str):
+            t = {"prompt": t}
+        if isinstance(t, dict):
+            out.append({"id": str(t.get("id", i)), "prompt": str(t.get("prompt", ""))})
+    return out
+
+# Optional repo policy file
+def load_policy():
+    policy_path = ROOT / ".ai-policy.yml"
+    if not policy_path.exists():
+        return {}
+    import yaml
+    # libyaml-backed loader when available; fed bytes so it decodes UTF-8 itself
+    Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    return yaml.load(policy_path.read_bytes(), Loader=Loader) or {}
+
+# -------- File discovery: one scandir walk per glob --------
+MAGIC = re.compile(r"[*?[]")
+
+def segment_to_regex(seg):
+    # Same rules as glob.glob: wildcards never cross '/', hidden names need an explicit dot
+    out = [] if seg.startswith(".") else [r"(?!\.)"]
+    i = 0
+    while i < len(seg):
+        c = seg[i]
+        i += 1
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            # A ']' right after '[' or '[!' belongs to the set
+            j = seg.find("]", i + (seg[i:i + 1] == "!") + 1)
+            if j < 0:
+                out.append(r"\[")
+                continue
+            # fnmatch's own translation of the set: escaping, a literal leading '^' and
+            # reversed ranges (which match nothing) come out exactly as glob.glob sees them
+            rx = fnmatch.translate(seg[i - 1:j + 1])[len("(?s:"):-len(r")\Z")]
+            i = j + 1
+            if rx.startswith("[^"):
+                rx = rx[:-1] + "/]"  # a negated set still never matches the separator
+            elif rx == ".":  # negation of an empty set
+                rx = "[^/]"
+            out.append(rx)
+        else:
+            out.append(re.escape(c))
+    return "".join(out)
+
+def glob_to_regex(g):
+    segs = g.split("/")
+    out = []
+    for i, seg in enumerate(segs):
+        last = i == len(segs) - 1
+        if seg == "**":
+            out.append(r"(?:[^/.][^/]*/)*" + (r"[^/.][^/]*" if last else ""))
+        else:
+            out.append(segment_to_regex(seg) + ("" if last else "/"))
+    return re.compile("(?s:" + "".join(out) + r")\Z")
+
+def compile_glob(g):
+    # -> (base dir to walk, max depth or None for unbounded, regex, descend into hidden dirs)
+    segs = pathlib.PurePosixPath(g).parts
+    n = next((i for i, seg in enumerate(segs) if MAGIC.search(seg)), len(segs))
+    rest = segs[n:]
+    depth = None if "**" in rest else len(rest)
+    hidden = any(seg.startswith(".") for seg in rest)
+    return "/".join(segs[:n]), depth, glob_to_regex("/".join(segs)), hidden
+
+def walk(top, depth, hidden):
+    # Yields (relative path, DirEntry); d_type from readdir answers is_dir/is_file without a stat
+    try:
+        it = os.scandir(top or ".")
+    except OSError:
+        return
+    with it:
+        for entry in it:
+            rel = f"{top}/{entry.name}" if top else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name == ".git" or entry.name.startswith(".") and not hidden:
+                    continue
+                if depth is None or depth > 1:
+                    yield from walk(rel, None if depth is None else depth - 1, hidden)
+            elif entry.is_file(follow_symlinks=False):
+                yield rel, entry
+
+def matches(globs):
+    for base, depth, rx, hidden in globs:
+        if depth == 0:  # no wildcards: a literal path
+            try:
+                st = os.lstat(base)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                yield base, st
+            continue
+        for rel, entry in walk(base, depth, hidden):
+            if rx.match(rel):
+                yield rel, entry.stat(follow_symlinks=False)
+
+def read_files(allow_globs, max_bytes):
+    # -> ([(Path, stat_result)] in glob order without duplicates, total bytes);
+    # stops as soon as the total passes max_bytes, so over-limit repos are not walked to the end
+    globs = [compile_glob(g) for g in dict.fromkeys(allow_globs)]
+    files = []
+    seen = set()
+    total = 0
+    for rel, st in matches(globs):
+        rel = os.path.normpath(rel)
+        if rel in seen:
+            continue
+        seen.add(rel)
+        p = pathlib.Path(rel)
+        if p.suffix.lower() in {".png",".jpg",".jpeg",".gif",".pdf",".zip",".tar",".gz"}:
+            continue
+        if p.name.startswith(".ai-"):  # never edit config by accident
+            continue
+        files.append((p, st))
+        total += st.st_size
+        if total > max_bytes:
+            break
+    return files, total
+
+def git(*args):
+    return subprocess.check_output(["git", *args], text=True).strip()
+
+def head_sha():
+    # libgit2 in-process when available; otherwise one `git rev-parse` subprocess
+    try:
+        import pygit2
+    except ImportError:
+        return git("rev-parse", "HEAD")
+    try:
+        return str(pygit2.Repository(str(ROOT)).head.target)
+    except pygit2.GitError:
+        return git("rev-parse", "HEAD")
+
+# -------- Read cache: skip re-reading files unchanged since the last run --------
+READ_CACHE_PATH = ROOT / ".git" / "ai-writer-cache.json"
+READ_CACHE_MAX = 100  # entries, least recently used evicted first
+MMAP_MIN_BYTES = 64 * 1024  # below this a plain read is cheaper than mmap + munmap
+
+def load_read_cache():
+    # {path: [mtime_ns, size, sha256, text]}, oldest first
+    try:
+        return OrderedDict(loads(READ_CACHE_PATH.read_bytes()))
+    except (OSError, ValueError):
+        return OrderedDict()
+
+def save_read_cache(cache):
+    if not READ_CACHE_PATH.parent.is_dir():
+        return
+    while len(cache) > READ_CACHE_MAX:
+        cache.popitem(last=False)
+    try:
+        READ_CACHE_PATH.write_bytes(dumps(cache))
+    except OSError:
+        pass
+
+def cached_text(cache, key, st):
+    # -> (text, sha256) from the cache, or None
+    hit = cache.get(key)
+    if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+        cache.move_to_end(key)
+        return hit[3], hit[2]
+    return None
+
+def read_file(p, size):
+    # -> (text, sha256)
+    if size < MMAP_MIN_BYTES:
+        # read_bytes skips TextIOWrapper and its buffered reader; we want the whole file anyway
+        raw = p.read_bytes()
+        return raw.decode("utf-8", "ignore"), hashlib.sha256(raw).hexdigest()
+    # Large files: hash and decode straight from the mapped pages, no heap copy of the bytes
+    with open(p, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return str(mm, "utf-8", "ignore"), hashlib.sha256(mm).hexdigest()
+
+def read_originals(files):
+    # -> ({path: text}, {path: sha256}); cache misses are read in parallel (I/O releases the GIL)
+    cache = load_read_cache()
+    original = {}
+    digests = {}
+    misses = []
+    for p, st in files:
+        hit = cached_text(cache, str(p), st)
+        if hit is None:
+            original[str(p)] = digests[str(p)] = None  # keep glob order; filled in below
+            misses.append((p, st))
+        else:
+            original[str(p)], digests[str(p)] = hit
+    if misses:
+        with ThreadPoolExecutor(max_workers=min(32, len(misses))) as ex:
+            texts = ex.map(read_file, [p for p, _ in misses], [st.st_size for _, st in misses])
+            for (p, st), (text, sha) in zip(misses, texts):
+                original[str(p)], digests[str(p)] = text, sha
+                cache[str(p)] = [st.st_mtime_ns, st.st_size, sha, text]
+    save_read_cache(cache)
+    return original, digests
+
+def build_bundle(original):
+    # Compact file bundle; same text as "\n\n".join(f"=== FILE: {path} ===\n{content}" ...)
+    # but written piecewise, without a formatted copy of every file
+    buf = io.StringIO()
+    w = buf.write
+    sep = ""
+    for path, content in original.items():
+        w(sep)
+        w("=== FILE: ")
+        w(path)
+        w(" ===\n")
+        w(content)
+        sep = "\n\n"
+    return buf.getvalue()
+
+# Strong instruction: ONLY return JSON
+SYSTEM_MSG = """You are a precise repo editor. You get a list of tasks {id, prompt} and one set of project files.
+- Apply each task to the provided files independently of the other tasks.
+- Make minimal, high-quality edits.
+- Preserve formatting and front-matter.
+- Do not invent facts or break links.
+- Return ONLY a JSON object with property 'results' which is an array with one {id, changes} per task,
+  where 'changes' is an array of objects {path, content}.
+- Example: {"results":[{"id":"1","changes":[{"path":"README.md","content":"..."}]}]}
+- If a task needs no changes, return it with "changes": [].
+"""
+
+# Structured-output schema for the reply; also what each results[] item is validated against
+CHANGE_SCHEMA = {
+    "type": "object",
+    "properties": {"path": {"type": "string"}, "content": {"type": "string"}},
+    "required": ["path", "content"],
+    "additionalProperties": False,
+}
+RESULT_SCHEMA = {
+    "type": "object",
+    "properties": {"id": {"type": "string"}, "changes": {"type": "array", "items": CHANGE_SCHEMA}},
+    "required": ["id", "changes"],
+    "additionalProperties": False,
+}
+CHANGES_SCHEMA = {
+    "name": "repo_edits",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {"results": {"type": "array", "items": RESULT_SCHEMA}},
+        "required": ["results"],
+        "additionalProperties": False,
+    },
+}
+
+@functools.cache
+def result_validator():
+    # Compiled on first use, once per run; None without fastjsonschema
+    if fastjsonschema is None:
+        return None
+    return fastjsonschema.compile(RESULT_SCHEMA)
+
+def result_error(result):
+    # -> None if result is a well-formed {id, changes} item, else the reason it is not
+    validate = result_validator()
+    if validate is not None:
+        try:
+            validate(result)
+        except fastjsonschema.JsonSchemaException as e:
+            return e.message
+        return None
+    # Without fastjsonschema: the same rules as RESULT_SCHEMA, checked by hand
+    if not isinstance(result, dict) or result.keys() != {"id", "changes"}:
+        return "result is not an object with exactly 'id' and 'changes'"
+    if not isinstance(result["id"], str):
+        return "'id' is not a string"
+    if not isinstance(result["changes"], list):
+        return "invalid 'changes' (not a list)"
+    for ch in result["changes"]:
+        if not isinstance(ch, dict) or ch.keys() != {"path", "content"}:
+            return "a change is not an object with exactly 'path' and 'content'"
+        if not isinstance(ch["path"], str) or not isinstance(ch["content"], str):
+            return "a change's 'path' or 'content' is not a string"
+    return None
+
+def build_request(tasks, file_bundle):
+    return {
+        "model": MODEL,
+        "reasoning": {"effort": "medium"},
+        "input": [
+            {"role": "system", "content": SYSTEM_MSG},
+            {"role": "user", "content": "Tasks:\n" + json.dumps(tasks) + "\n\nFiles:\n" + file_bundle},
+        ],
+        "text": {"format": {"type": "json_schema", **CHANGES_SCHEMA}},
+    }
+
+def make_client():
+    from openai import OpenAI
+    api_key = os.environ.get("OPENAI_API_KEY") or os.environ.get("OPEN_AI_KEY")
+    if not api_key:
+        print("No API key found in env (tried OPENAI_API_KEY and OPEN_AI_KEY).", file=sys.stderr)
+        sys.exit(1)
+    return OpenAI(api_key=api_key)
+
+# -------- Response cache: same tasks + same files -> reuse the previous results --------
+RESPONSE_CACHE_DIR = ROOT / ".git" / "ai-writer-response-cache"
+RESPONSE_CACHE_MAX = 1000  # entries, least recently used (by mtime) evicted first
+
+def response_key(prompt, digests):
+    # The bundle is a function of the file paths and bytes, so hash their digests
+    # rather than re-encoding the whole bundle; surrogatepass keeps non-UTF-8 names hashable
+    h = hashlib.sha256(f"{MODEL}\0{SYSTEM_MSG}\0{prompt}\0".encode("utf-8", "surrogatepass"))
+    for path, sha in digests.items():
+        h.update(f"{path}\0{sha}\0".encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+def load_response(key):
+    path = RESPONSE_CACHE_DIR / f"{key}.json"
+    try:
+        results = loads(path.read_bytes())
+        os.utime(path)  # mark as recently used
+    except (OSError, ValueError):
+        return None
+    return results if isinstance(results, list) else None
+
+def store_response(key, results):
+    if not RESPONSE_CACHE_DIR.parent.is_dir():
+        return
+    try:
+        RESPONSE_CACHE_DIR.mkdir(exist_ok=True)
+        (RESPONSE_CACHE_DIR / f"{key}.json").write_bytes(dumps(results))
+        entries = list(os.scandir(RESPONSE_CACHE_DIR))
+        if len(entries) > RESPONSE_CACHE_MAX:
+            entries.sort(key=lambda e: e.stat().st_mtime_ns)
+            for e in entries[:len(entries) - RESPONSE_CACHE_MAX]:
+                os.unlink(e.path)
+    except OSError:
+        pass
+
+# -------- Batch API (async runs) --------
+def submit_batch(client, request_body):
+    line = {
+        "custom_id": head_sha(),
+        "method": "POST",
+        "url": "/v1/responses",
+        "body": request_body,
+    }
+    upload = client.files.create(
+        file=("ai-writer-batch.jsonl", dumps(line) + b"\n"),
+        purpose="batch",
+    )
+    batch = client.batches.create(
+        input_file_id=upload.id,
+        endpoint="/v1/responses",
+        completion_window="24h",
+    )
+    # Results are collected by a later run of the workflow with this batch_id
+    note = (f"Submitted batch {batch.id}. Collect it by running the workflow again "
+            f"with batch_id={batch.id} and the same prompt and paths.")
+    print(f"::notice::{note}")
+    summary = os.getenv("GITHUB_STEP_SUMMARY")
+    if summary:
+        with open(summary, "a", encoding="utf-8") as f:
+            f.write(note + "\n")
+
+def collect_batch(client, batch_id, poll_seconds, max_polls):
+    # -> response body, or None if the batch is still running after max_polls checks
+    for attempt in range(max_polls):
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in {"completed", "failed", "expired", "cancelled"}:
+            break
+        if attempt == max_polls - 1:
+            print(f"::notice::Batch {batch_id} is still {batch.status}; "
+                  f"run the workflow again with batch_id={batch_id} to collect it.")
+            return None
+        print(f"Batch {batch_id} is {batch.status}; checking again in {poll_seconds}s.")
+        time.sleep(poll_seconds)
+    if batch.status != "completed" or not batch.output_file_id:
+        print(f"Batch {batch_id} ended with status '{batch.status}'.", file=sys.stderr)
+        if batch.error_file_id:
+            print(client.files.content(batch.error_file_id).text, file=sys.stderr)
+        sys.exit(1)
+    # One request per batch, so the output file holds a single line
+    lines = client.files.content(batch.output_file_id).content.splitlines()
+    if not lines:
+        print(f"Batch {batch_id} completed with an empty output file.", file=sys.stderr)
+        sys.exit(1)
+    line = loads(lines[0])
+    # The edits replace whole files as they were at submit time; applying them to a newer
+    # tree (or caching them under its digests) would silently undo the commits in between
+    head = head_sha()
+    if line.get("custom_id") != head:
+        print(f"Batch {batch_id} was submitted at commit {line.get('custom_id')}, but HEAD is now "
+              f"{head}; submit a new batch for the current files.", file=sys.stderr)
+        sys.exit(1)
+    result = line.get("response") or {}
+    if line.get("error") or result.get("status_code") != 200:
+        print(f"Batch request failed: {line.get('error') or result}", file=sys.stderr)
+        sys.exit(1)
+    return result["body"]
+
+# -------- Parse model output into JSON --------
+def to_text(resp):
+    # Batch results are raw response bodies rather than SDK objects
+    if isinstance(resp, dict):
+        return "".join(
+            c.get("text") or ""
+            for item in resp.get("output") or []
+            for c in item.get("content") or []
+            if c.get("type") == "output_text"
+        )
+    # Prefer output_text if present
+    txt = getattr(resp, "output_text", None)
+    if txt:
+        return txt
+    # Try to reconstruct from blocks
+    try:
+        parts = []
+        for item in getattr(resp, "output", []):
+            for c in getattr(item, "content", []):
+                if hasattr(c, "text") and c.text:
+                    parts.append(c.text)
+        if parts:
+            return "".join(parts)
+    except Exception:
+        pass
+    return str(resp)
+
+def parse_results(out_text, tasks):
+    # Try strict JSON first, then a fallback that extracts the first {...} block
+    data = None
+    try:
+        data = loads(out_text)
+    except Exception:
+        m = re.search(r"\{.*\}", out_text, flags=re.DOTALL)
+        if m:
+            try:
+                data = loads(m.group(0))
+            except Exception:
+                pass
+
+    # Tolerate the single-task shape {"changes": [...]}
+    if isinstance(data, dict) and "results" not in data and "changes" in data and tasks:
+        data = {"results": [{"id": tasks[0]["id"], "changes": data["changes"]}]}
+
+    if not isinstance(data, dict) or "results" not in data:
+        print("Failed to parse model output as JSON. Raw output:\n", out_text, file=sys.stderr)
+        return None
+
+    results = data.get("results", [])
+    if not isinstance(results, list):
+        print("Model returned invalid 'results' (not a list); aborting.", file=sys.stderr)
+        return None
+    return results
+
+# ---- APPLY CHANGES ----
+def write_file(p, content):
+    try:
+        mode = stat.S_IMODE(os.stat(p).st_mode)
+    except FileNotFoundError:
+        mode = None
+        p.parent.mkdir(parents=True, exist_ok=True)
+    # Write a sibling temp file and rename it over the target, so a cancelled run never
+    # leaves a half-written file; the .ai- prefix keeps it out of read_files()
+    tmp = p.with_name(f".ai-{p.name}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            if mode is not None:
+                os.fchmod(f.fileno(), mode)
+            f.write(content.encode("utf-8"))
+        os.replace(tmp, p)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+class ChangeWriter:
+    # Writes run in the background so streaming can keep consuming output
+
+    def __init__(self, allow_globs):
+        # All allow-list globs as one alternation, compiled once; fnmatch's '*' also spans '/',
+        # so "docs/**" still admits new files anywhere under docs/
+        self.allow_re = re.compile("|".join(f"(?:{fnmatch.translate(g)})" for g in allow_globs) or r"(?!)")
+        self.pool = ThreadPoolExecutor()
+        self.pending = {}  # path -> Future of its latest write
+
+    def allowed_by_globs(self, path: str) -> bool:
+        # path is already posix-form, so nothing is re-derived per check
+        return bool(self.allow_re.match(path))
+
+    def apply_changes(self, changes):
+        # changes have passed result_error(): every entry is {path: str, content: str}
+        applied = 0
+        for ch in changes:
+            content = ch["content"]
+            # Normalised once per change, so "docs/../docs/a.md" and "docs/a.md" are one file
+            # for the allow-list check, the pending-write key and the temp file name
+            path = os.path.normpath(pathlib.Path(ch["path"]).as_posix())
+            p = pathlib.Path(path)
+            if not self.allowed_by_globs(path):
+                continue
+            if os.path.islink(path):  # discovery skips symlinks; os.replace would clobber the link
+                print(f"Skipping {path}: it is a symlink.", file=sys.stderr)
+                continue
+            prev = self.pending.get(path)
+            if prev is not None:
+                prev.result()  # same file rewritten by a later task: keep task order
+            self.pending[path] = self.pool.submit(write_file, p, content.replace("\r\n","\n"))
+            applied += 1
+        return applied
+
+    def apply_result(self, result):
+        task_id = str(result.get("id")) if isinstance(result, dict) else "?"
+        error = result_error(result)
+        if error:
+            print(f"Task {task_id}: {error}; skipping.", file=sys.stderr)
+            return 0
+        n = self.apply_changes(result["changes"])
+        print(f"Task {task_id}: applied changes to {n} file(s).")
+        return n
+
+    def close(self):
+        self.pool.shutdown()
+        for f in self.pending.values():
+            f.result()  # re-raise any write error
+
+# -------- Streaming: apply each task as soon as its result object is complete --------
+def stream_and_apply(client, request_body, tasks, writer):
+    # -> (files applied, results applied while streaming, results still to apply or None,
+    # whether the response completed). Results are written as they close, so a generation
+    # that fails midway leaves the earlier tasks applied; the rest is then neither applied
+    # nor cached, and main() exits non-zero so the partial edits are not committed.
+    done = ijson.sendable_list()
+    parser = ijson.items_coro(done, "results.item")
+    chunks = []
+    streamed = []
+    applied = 0
+    status, detail = None, None  # from the terminal event
+    with client.responses.create(**request_body, stream=True) as stream:
+        for event in stream:
+            if event.type in {"response.completed", "response.failed", "response.incomplete"}:
+                status = event.response.status
+                detail = event.response.error or event.response.incomplete_details
+                continue
+            if event.type == "error":
+                status, detail = "error", getattr(event, "message", None)
+                continue
+            if event.type != "response.output_text.delta":
+                continue
+            chunks.append(event.delta)
+            if parser is None:
+                continue
+            try:
+                parser.send(event.delta.encode("utf-8"))
+            except ijson.JSONError:
+                parser = None  # not bare JSON (prose, code fences); parse the full text below
+                continue
+            for result in done:
+                applied += writer.apply_result(result)
+                streamed.append(result)
+            del done[:]
+    if status != "completed":
+        print(f"Model response did not complete (status: {status or 'stream ended early'}; {detail}). "
+              f"{len(streamed)} finished task(s) were written; the rest is skipped and the run fails.", file=sys.stderr)
+        return applied, streamed, None, False
+    if parser is not None:
+        try:
+            parser.close()
+        except ijson.JSONError:
+            parser = None
+    if parser is not None and streamed:
+        return applied, streamed, [], True
+    results = parse_results("".join(chunks).strip(), tasks)
+    return applied, streamed, None if results is None else results[len(streamed):], True
+
+def main():
+    prompt = os.environ["INPUT_PROMPT"].strip()
+    allow_globs = [p.strip() for p in os.environ["INPUT_PATHS"].split(",") if p.strip()]
+    batch_id = os.getenv("INPUT_BATCH_ID", "").strip()  # collect this batch instead of asking again
+    # Ask the model again even if a cached response exists; the new answer replaces it
+    refresh = os.getenv("INPUT_REFRESH", "").strip().lower() in {"1", "true", "yes"}
+    tasks = parse_tasks(prompt)
+    if not tasks:
+        print("INPUT_PROMPT is a list with no usable tasks; nothing to do.")
+        return
+
+    max_bytes = ALLOW_MAX_BYTES
+    batch = False  # submit through the Batch API instead of a synchronous call
+    poll_seconds = BATCH_POLL_SECONDS
+    max_polls = BATCH_MAX_POLLS
+    use_cache = True  # reuse the response of an earlier run with the same tasks and files
+    policy = load_policy()
+    if policy:
+        max_bytes = int(policy.get("max_bytes", max_bytes))
+        if "allow_globs" in policy:
+            allow_globs = policy["allow_globs"]
+        batch = bool(policy.get("batch", batch))
+        poll_seconds = int(policy.get("batch_poll_seconds", poll_seconds))
+        max_polls = max(1, int(policy.get("batch_max_polls", max_polls)))
+        use_cache = bool(policy.get("response_cache", use_cache))
+
+    files, total_bytes = read_files(allow_globs, max_bytes)
+    if not files:
+        print("No files matched the allowed globs; nothing to edit.")
+        return
+
+    if total_bytes > max_bytes:
+        print(f"Refusing: at least {total_bytes} bytes exceeds limit {max_bytes}", file=sys.stderr)
+        return
+
+    # Capture original contents
+    original, digests = read_originals(files)
+
+    file_bundle = build_bundle(original)
+
+    # Tasks are applied in order, so a later task wins if two rewrite the same file
+    writer = ChangeWriter(allow_globs)
+    key = response_key(prompt, digests)
+    applied = 0
+    fresh = None  # newly parsed results, for the response cache
+    results = load_response(key) if use_cache and not refresh else None
+    if results is not None:
+        print("Tasks and files are unchanged since a previous run; reusing its response.")
+    else:
+        client = make_client()
+        request_body = build_request(tasks, file_bundle)
+        if batch_id:
+            body = collect_batch(client, batch_id, poll_seconds, max_polls)
+            if body is None:
+                return
+            results = fresh = parse_results(to_text(body).strip(), tasks)
+        elif batch:
+            submit_batch(client, request_body)
+            return
+        elif ijson is not None:
+            applied, streamed, results, completed = stream_and_apply(client, request_body, tasks, writer)
+            if not completed:
+                writer.close()
+                sys.exit(1)
+            fresh = None if results is None else streamed + results
+        else:
+            out_text = to_text(client.responses.create(**request_body)).strip()
+            results = fresh = parse_results(out_text, tasks)
+    if fresh is not None and use_cache:
+        store_response(key, fresh)
+
+    # results is None when the output could not be parsed; that has been reported already
+    for result in results or []:
+        applied += writer.apply_result(result)
+    writer.close()
+
+    print(f"Applied changes to {applied} file(s).")
@@ -0,0 +1,51 @@
+# Parity check: read_files() must pick the same files glob.glob(recursive=True) does,
+# apart from symlinks, which the walker deliberately skips.
+#   python -m unittest discover -s .github/workflows/tests
+import glob, os, pathlib, sys, tempfile, unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from ai_writer.core import read_files
+
+TREE = [
+    "README.md", "notes.txt", ".hidden.md", ".ai-policy.yml",
+    "docs/a.md", "docs/b.txt", "docs/x.md", "docs/^.md", "docs/[x].md", "docs/.h.md",
+    "docs/a].md", "docs/]b.md", "docs/-.md",
+    "docs/sub/c.md", "docs/sub/y1.md", "docs/sub/deep/d.md",
+    "docs/.hid/e.md", ".hd/f.md", "content/posts/p1.md", "content/posts/2024/p2.md",
+]
+
+GLOBS = [
+    "README.md", "*", "**", "*.md", "**/*.md", "docs/**", "docs/*.md", "docs/**/*.md",
+    "./docs/*", "docs/", "nope/**", "docs/.*", "docs/.hid/*", ".hd/*", "**/.h.md",
+    "docs/[!a]*.md", "docs/[^a].md", "docs/[[]x].md", "docs/[]x].md", "docs/[a-c].md",
+    "[!]]*", "docs/[!]]*", "docs/[]a]*", "docs/[z-a]*", "docs/[!z-a]*", "docs/[!a-]*",
+    "docs/sub/?1.md", "docs/sub/*/*.md", "content/**", "content/*/*.md", "*/posts/**",
+]
+
+class GlobParityTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        for rel in TREE:
+            pathlib.Path(rel).parent.mkdir(parents=True, exist_ok=True)
+            pathlib.Path(rel).write_text("x\n", encoding="utf-8")
+        os.symlink("../README.md", "docs/link.md")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_matches_glob_glob(self):
+        for g in GLOBS:
+            with self.subTest(glob=g):
+                files, _ = read_files([g], max_bytes=1 << 30)
+                expected = sorted({
+                    os.path.normpath(p) for p in glob.glob(g, recursive=True)
+                    if os.path.isfile(p) and not os.path.islink(p)
+                    and not os.path.basename(p).startswith(".ai-")
+                })
+                self.assertEqual(sorted(str(p) for p, _ in files), expected)
+
+if __name__ == "__main__":
+    unittest.main()